@@ -10,6 +10,7 @@ import logging
 from time import time
 
 from src.utils.encoder import ExtendedEncoder, returns_json
+from src.utils.batching import BatchingPredictor
 from src.factory import ModelFactory
 
 # Version of this APP template
@@ -19,6 +20,8 @@ DEBUG = os.environ.get('DEBUG', False)
 MODEL_NAME = os.environ.get('MODEL_NAME', 'model.joblib')
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'local')
 MODEL_TYPE = os.environ.get('MODEL_TYPE', 'SKLEARN_MODEL')
+PREDICT_BATCH_WINDOW_MS = int(os.environ.get('PREDICT_BATCH_WINDOW_MS', 0))
+PREDICT_BATCH_MAX_SIZE = int(os.environ.get('PREDICT_BATCH_MAX_SIZE', 64))
 SERVICE_START_TIMESTAMP = time()
 # Create Flask Application
 application = flask.Flask(__name__)
@@ -27,6 +30,14 @@ application.logger.setLevel(logging.DEBUG if DEBUG else logging.ERROR)
 application.json_encoder = ExtendedEncoder
 # Create Model instance
 model = ModelFactory.create_model(MODEL_NAME, MODEL_TYPE)
+# Optional micro-batching: with threaded workers, concurrent requests
+# arriving within the window are served by a single model call
+if PREDICT_BATCH_WINDOW_MS > 0:
+    predictor = BatchingPredictor(model,
+                                  window_ms=PREDICT_BATCH_WINDOW_MS,
+                                  max_batch=PREDICT_BATCH_MAX_SIZE)
+else:
+    predictor = model
 # load saved model
 application.logger.info('ENVIRONMENT: {}'.format(ENVIRONMENT))
 application.logger.info('Using template version: {}'.format(__version__))
@@ -79,7 +90,7 @@ def predict():
     before_time = time()
     try:
         predict_function = 'predict_proba' if do_proba else 'predict'
-        prediction = getattr(model, predict_function)(input)
+        prediction = getattr(predictor, predict_function)(input)
     except Exception as err:
         return flask.Response(str(err), status=500)
     result = {'prediction': prediction}
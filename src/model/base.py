@@ -6,14 +6,13 @@ from pandas.api.types import CategoricalDtype
 from threading import Thread
 from copy import deepcopy
 from functools import wraps
+from importlib.util import find_spec
 
 
-try:
-    import shap
-except ImportError:
-    SHAP_AVAILABLE = False
-else:
-    SHAP_AVAILABLE = True
+# Only check that shap is installed: importing it (and transitively numba)
+# is expensive, so the actual import is deferred until an explanation is
+# requested (see src.model.sklearn).
+SHAP_AVAILABLE = find_spec('shap') is not None
 
 
 def _check(ready=True, explainable=False, task=None):
@@ -62,6 +61,11 @@ class Task(int):
 
 class BaseModel(object):
     """Abstract class that handles the loaded model."""
+    # Slots keep per-instance memory low and speed up the attribute reads
+    # performed on every request. Subclasses must declare their own slots.
+    __slots__ = ('_file_name', '_is_ready', '_model', '_metadata',
+                 '_task_type', '_is_explainable', '_colnames_tuple',
+                 '_colnames_index')
     family = ''
     # Explainable models
     _explainable_models = tuple()
@@ -79,7 +83,6 @@ class BaseModel(object):
         """Abstract method"""
         raise NotImplementedError()
 
-    @_check()
     def _get_predictor(self):
         """Abstract method"""
         raise NotImplementedError()
@@ -109,6 +112,11 @@ class BaseModel(object):
         """Abstract method"""
         raise NotImplementedError()
 
+    @_check(explainable=True)
+    def explain_batch(self, records, samples=None):
+        """Abstract method"""
+        raise NotImplementedError()
+
     # Private
     def _get_predictor_type(self):
         return str(type(self._get_predictor()))
@@ -117,7 +125,12 @@ class BaseModel(object):
         # Fill attributes
         self._model = model
         self._metadata = metadata
-        self._is_ready = True
+        # Ordered feature names, immutable once the model is loaded. The
+        # pd.Index twin gives O(1) hash-based column lookups to callers
+        # that slice DataFrames.
+        self._colnames_tuple = tuple(
+            f['name'] for f in (metadata.get('features') or []))
+        self._colnames_index = pd.Index(self._colnames_tuple)
         # Hydrate class
         clf = self._get_predictor()
         # SHAP
@@ -135,10 +148,14 @@ class BaseModel(object):
             self._task_type = Task('BINARY_CLASSIFICATION')
         elif len(clf.classes_) > 2:
             self._task_type = Task('MULTILABEL_CLASSIFICATION')
+        # Readiness must be flagged last: load() hydrates on a background
+        # thread while requests are served, so a model reporting ready with
+        # half-built attributes would crash the prediction methods.
+        self._is_ready = True
 
     @_check()
     def _feature_names(self):
-        return [variable['name'] for variable in self.features()]
+        return list(self._colnames_tuple)
 
     @_check()
     def _validate(self, input):
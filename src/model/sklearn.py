@@ -1,3 +1,7 @@
+import logging
+import os
+import tempfile
+
 import joblib
 import numpy as np
 import pandas as pd
@@ -5,10 +9,20 @@ import pandas as pd
 
 from .base import BaseModel, _check
 
-try:
-    import shap
-except ImportError:
-    pass
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily through _get_shap: pulling in shap at module load slows
+# every worker start and costs memory even when explain is never called.
+_shap = None
+
+
+def _get_shap():
+    global _shap
+    if _shap is None:
+        import shap
+        _shap = shap
+    return _shap
 
 
 class SklearnModel(BaseModel):
@@ -28,6 +42,10 @@ class SklearnModel(BaseModel):
             File path of the serialized model. It must be a file that can be
             loaded using :mod:`joblib`
     """
+    __slots__ = ('_cached_predictor', '_cached_predictor_type',
+                 '_cached_class_names', '_explainer_cache',
+                 '_numeric_fast_path', '_explain_needs_pandas',
+                 '_compiled_predictor', '_inference_dtype')
     family = 'SKLEARN_MODEL'
 
     # Explainable models
@@ -42,30 +60,192 @@ class SklearnModel(BaseModel):
         # LightGBM
         'LGBMClassifier', 'LGBMRegressor')
 
+    # Predictors that cast their input to float32 internally, so feeding
+    # them float32 is lossless. LightGBM and CatBoost compare against
+    # double-precision thresholds and must keep float64 inputs. A raw
+    # xgboost.Booster also computes in float32, but it shares its class
+    # name with lightgbm's Booster and is matched by module in _hydrate.
+    _float32_predictors = (
+        # Sklearn
+        'DecisionTreeClassifier', 'DecisionTreeRegressor',
+        'RandomForestClassifier', 'RandomForestRegressor',
+        # XGBoost
+        'XGBClassifier', 'XGBRegressor')
+
+    # Background pool size for explanations in probability space. SHAP
+    # recommends 100 to 1000 random samples; the interventional mode cost
+    # grows with the pool, so the lower bound is used.
+    _background_sample_size = 100
+
     # Private
     def _load(self):
         # Load serialized model (dict expected)
         loaded = joblib.load(self._file_name)
         self._hydrate(loaded['model'], loaded['metadata'])
 
-    @_check()
+    def _hydrate(self, model, metadata):
+        # The predictor, its type and its class names are immutable once the
+        # model is loaded, so they are computed once here instead of walking
+        # the Pipeline/CalibratedClassifier chain on every request.
+        self._cached_predictor = SklearnModel._extract_base_predictor(model)
+        self._cached_predictor_type = str(type(self._cached_predictor))
+        # Some models expect the explanation input as a pandas DataFrame
+        # instead of a numpy array. Ex: LightGBM
+        self._explain_needs_pandas = any(
+            c in self._cached_predictor_type
+            for c in ('LGBMClassifier', 'LGBMRegressor'))
+        # Feeding float32 halves the bytes moved through the tree walk, but
+        # only predictors that compute in float32 anyway can take it without
+        # risking flipped split decisions near thresholds (see
+        # _float32_predictors). Everything else keeps float64. 'Booster' is
+        # ambiguous (xgboost and lightgbm both use the name), hence the
+        # module check.
+        predictor_class = type(self._cached_predictor)
+        if (predictor_class.__name__ in self._float32_predictors or
+                (predictor_class.__name__ == 'Booster' and
+                 predictor_class.__module__.startswith('xgboost'))):
+            self._inference_dtype = np.float32
+        else:
+            self._inference_dtype = np.float64
+        # Bounded explainer cache (see _get_explainer); reloading the model
+        # flushes it.
+        self._explainer_cache = {}
+        # Single-record predictions can skip the DataFrame built by
+        # _validate, but only when skipping it cannot change behaviour: the
+        # model must be a bare estimator (a Pipeline step could expect named
+        # columns) and every feature must be numeric, without a default to
+        # fill in and tolerant to missing values (a NaN in the payload would
+        # otherwise dodge the fillna/rejection logic of _validate).
+        features = metadata.get('features') or []
+        self._numeric_fast_path = (
+            model is self._cached_predictor and
+            bool(features) and
+            all(f['type'] == 'numeric' and
+                f.get('default') is None and
+                f.get('accepts_missing', True)
+                for f in features))
+        # Ahead-of-time compiled variant of the ensemble (optional). The
+        # compiled library takes plain numeric arrays, so it is only used
+        # on the numeric fast path.
+        if self._numeric_fast_path:
+            self._compiled_predictor = self._try_compile_predictor()
+        else:
+            self._compiled_predictor = None
+        classes = getattr(self._cached_predictor, 'classes_', None)
+        if classes is not None:
+            # Plain Python strings: every consumer uses them as dict keys or
+            # JSON values, so a NumPy unicode array would only add copies.
+            self._cached_class_names = tuple(str(c) for c in classes)
+        else:
+            self._cached_class_names = None
+        # The base hydration flags readiness at its end, so every cached
+        # attribute (and the optional treelite compilation, which can take
+        # a while) must be in place before it runs: load() hydrates on a
+        # background thread while requests are being served.
+        super(SklearnModel, self)._hydrate(model, metadata)
+
     def _get_predictor(self):
-        return SklearnModel._extract_base_predictor(self._model)
+        return self._cached_predictor
+
+    def _get_predictor_type(self):
+        return self._cached_predictor_type
 
     @_check(task='classification')
     def _get_class_names(self):
-        return np.array(self._get_predictor().classes_, str)
+        return self._cached_class_names
+
+    @_check(explainable=True)
+    def _get_explainer(self, samples=None):
+        # Building a TreeExplainer walks the whole tree structure, which is
+        # too expensive to repeat on every request. Explainers are therefore
+        # memoized: the raw-output explainer under a sentinel key and the
+        # most recent background-data one under a content hash of the
+        # samples.
+        shap = _get_shap()
+        if samples is None:
+            key = 'margin'
+            params = {
+                'feature_dependence': 'tree_path_dependent',
+                'model_output': 'margin'}
+        else:
+            background = self.preprocess(self._validate(samples))
+            key = (pd.util.hash_pandas_object(background).values.tobytes(),
+                   'probability')
+            # Interventional SHAP cost scales with the background size, so
+            # oversized pools are downsampled once before the (cached)
+            # explainer is built. The key is taken over the full pool, so
+            # repeated payloads still hit the same cache entry.
+            if len(background) > self._background_sample_size:
+                background = shap.sample(
+                    background, self._background_sample_size)
+            params = {
+                'data': background,
+                'feature_dependence': 'independent',
+                'model_output': 'probability'}
+        explainer = self._explainer_cache.get(key)
+        if explainer is None:
+            if samples is not None:
+                # Keep a single background explainer: the samples come from
+                # the request payload, so caching one entry per distinct
+                # pool would grow without bound over the worker's lifetime.
+                stale = [k for k in self._explainer_cache if k != 'margin']
+                for old_key in stale:
+                    del self._explainer_cache[old_key]
+                if stale:
+                    logger.warning(
+                        'Rebuilding the SHAP explainer for a new _samples '
+                        'pool; send the same pool on every request to avoid '
+                        'paying the explainer construction each time.')
+            explainer = shap.TreeExplainer(self._get_predictor(), **params)
+            self._explainer_cache[key] = explainer
+        return explainer
+
+    def _try_compile_predictor(self):
+        # Best-effort ahead-of-time compilation of tree ensembles: treelite
+        # replaces the per-tree Python dispatch with one native call, which
+        # pays off on wide or deep forests. Compilation is strictly
+        # optional; a missing package, an unsupported model class or a
+        # missing toolchain leaves the regular estimator in place.
+        try:
+            import treelite
+            import treelite_runtime
+        except ImportError:
+            return None
+        try:
+            tl_model = treelite.sklearn.import_model(self._cached_predictor)
+            libpath = os.path.join(tempfile.mkdtemp(prefix='treelite_'),
+                                   'predictor.so')
+            tl_model.export_lib(toolchain='gcc', libpath=libpath,
+                                params={'parallel_comp': 8})
+            return treelite_runtime.Predictor(libpath)
+        except Exception:
+            return None
+
+    def _predict_compiled(self, data_2d, proba=False):
+        import treelite_runtime
+        output = self._compiled_predictor.predict(
+            treelite_runtime.DMatrix(data_2d))
+        if self._is_regression:
+            return output
+        if output.ndim == 1:
+            # Binary classifiers yield only the positive-class probability
+            output = np.column_stack([1.0 - output, output])
+        if proba:
+            return output
+        return self._cached_predictor.classes_[np.argmax(output, axis=1)]
 
     # Private (static)
     @staticmethod
     def _extract_base_predictor(model):
-        model_name = type(model).__name__
-        if model_name == 'Pipeline':
-            return SklearnModel._extract_base_predictor(model.steps[-1][1])
-        elif 'CalibratedClassifier' in model_name:
-            return SklearnModel._extract_base_predictor(model.base_estimator)
-        else:
-            return model
+        # Iterative unwrapping: no recursion frames for nested meta-estimators
+        while True:
+            model_name = type(model).__name__
+            if model_name == 'Pipeline':
+                model = model.steps[-1][1]
+            elif 'CalibratedClassifier' in model_name:
+                model = model.base_estimator
+            else:
+                return model
 
     # Public
     @_check()
@@ -93,7 +273,6 @@ class SklearnModel(BaseModel):
         else:
             return input
 
-    @_check()
     def predict(self, features):
         """Make a prediciton
 
@@ -114,11 +293,31 @@ class SklearnModel(BaseModel):
         Raises:
             RuntimeError: If the model is not ready.
         """
+        # Readiness check inlined: the _check wrapper costs an extra call
+        # per request on this hot path
+        if not self._is_ready:
+            raise RuntimeError('Model is not ready yet.')
+        if self._numeric_fast_path and isinstance(features, dict):
+            # Build the 1xF input array directly; a missing or non-numeric
+            # value makes the conversion fail and the request falls back to
+            # the validated DataFrame path below.
+            try:
+                row = np.fromiter(
+                    (features[name] for name in self._colnames_tuple),
+                    dtype=self._inference_dtype,
+                    count=len(self._colnames_tuple))
+            except (KeyError, TypeError, ValueError):
+                pass
+            else:
+                if self._compiled_predictor is not None:
+                    return self._predict_compiled(row.reshape(1, -1))
+                return self._model.predict(row.reshape(1, -1))
         input = self._validate(features)
+        if self._compiled_predictor is not None and self._numeric_fast_path:
+            return self._predict_compiled(input.to_numpy(copy=False))
         result = self._model.predict(input)
         return result
 
-    @_check(task='classification')
     def predict_proba(self, features):
         """Make a prediciton
 
@@ -138,12 +337,25 @@ class SklearnModel(BaseModel):
         Raises:
             RuntimeError: If the model isn't ready or the task isn't classification.
         """
+        # Inlined version of the _check(task='classification') guard
+        if not self._is_ready:
+            raise RuntimeError('Model is not ready yet.')
+        if self._cached_class_names is None:
+            raise RuntimeError('This method is not available for {} tasks'
+                               .format(self._task_type.name.lower()))
         input = self._validate(features)
-        prediction = self._model.predict_proba(input)
-        df = pd.DataFrame(prediction, columns=self._get_class_names())
-        return df.to_dict(orient='records')
+        if self._compiled_predictor is not None:
+            prediction = self._predict_compiled(input.to_numpy(copy=False),
+                                                proba=True)
+        else:
+            prediction = self._model.predict_proba(input)
+        # Build the records directly: a DataFrame round-trip would allocate
+        # a BlockManager and per-column Series just to be thrown away. The
+        # values stay NumPy scalars; both serialization paths (orjson with
+        # OPT_SERIALIZE_NUMPY and ExtendedEncoder) handle them natively.
+        class_names = self._get_class_names()
+        return [dict(zip(class_names, row)) for row in prediction]
 
-    @_check(explainable=True)
     def explain(self, features, samples=None):
         """Explain the prediction of a model.
 
@@ -176,52 +388,99 @@ class SklearnModel(BaseModel):
                 explanations or the model is not already loaded.
                 Or if the explainer outputs an unknown object
         """
+        # Inlined version of the _check(explainable=True) guard
+        if not self._is_ready:
+            raise RuntimeError('Model is not ready yet.')
+        if not self._is_explainable:
+            raise ValueError('Model not supported for explanations: {}'.format(
+                type(self._model).__name__))
         # Process input
         preprocessed = self.preprocess(features)
-        # Define parameters
-        if samples is None:
-            params = {
-                'feature_dependence': 'tree_path_dependent',
-                'model_output': 'margin'}
+        # Explainer (cached, see _get_explainer)
+        explainer = self._get_explainer(samples)
+        colnames = self._colnames_tuple
+        # Reorder columns only when needed: when the preprocessed frame is
+        # already in model order, reindexing would copy the whole frame for
+        # nothing.
+        if tuple(preprocessed.columns) == colnames:
+            input_data = preprocessed
         else:
-            params = {
-                'data': self.preprocess(self._validate(samples)),
-                'feature_dependence': 'independent',
-                'model_output': 'probability'}
-        # Explainer
-        explainer = shap.TreeExplainer(self._get_predictor(), **params)
-        colnames = self._feature_names()
-        # This patch will ensure that the data will be fed as a pandas DataFrame
-        # instead of as a numpy array to some models. Ex: LightGBM
-        input_data = preprocessed[colnames]
-        predictor_type = self._get_predictor_type()
-        use_pandas = any(c in predictor_type for c in ('LGBMClassifier', 'LGBMRegressor'))
-        shap_values = explainer.shap_values(input_data if use_pandas else input_data.values)
-
-        # Create an index to handle multiple samples input
-        index = preprocessed.index
+            input_data = preprocessed.reindex(columns=self._colnames_index,
+                                              copy=False)
+        # to_numpy(copy=False) hands SHAP a view when the frame holds a
+        # single numeric block, while .values could force a consolidation
+        # copy of the whole frame. LightGBM models get the DataFrame itself
+        # (see _explain_needs_pandas, folded at hydration).
+        if self._explain_needs_pandas:
+            data = input_data
+        else:
+            data = input_data.to_numpy(copy=False)
+            if data.dtype == np.float64 and self._inference_dtype == np.float32:
+                # Half-size input for predictors that compute in float32
+                data = data.astype(np.float32)
+        shap_values = explainer.shap_values(data)
+
+        # Convert SHAP matrices straight into records; the index is not
+        # needed since the records format drops it anyway. Values stay
+        # NumPy scalars for the serializer to encode (see predict_proba).
+        colnames_list = list(colnames)
+
+        def _to_records(values_2d):
+            return [dict(zip(colnames_list, row)) for row in values_2d]
+
         result = {}
         if self._is_classification:
             class_names = self._get_class_names()
             if isinstance(shap_values, list):
                 # The result is one set of explanations per target class
-                process_shap_values = False
+                stacked = np.asarray(shap_values)
             elif isinstance(shap_values, np.ndarray) and self._is_binary_classification:
                 # The result is one ndarray set of explanations for one class
                 # Expected only for binary classification for some models.
                 # Ex: LGBMClassifier
-                process_shap_values = True
+                # One negation for the negative class; the positive class
+                # reuses the SHAP buffer as-is (no stack copy, no identity
+                # multiply).
+                stacked = (np.negative(shap_values), shap_values)
             else:
                 raise ValueError('Unknown objet class for shap_values variable')
-            # Format output
+            # Format output: each per-class matrix is contiguous, so the
+            # row iteration is a straight memory walk.
             for i, c in enumerate(class_names):
-                if process_shap_values:
-                    _values = shap_values * (-1 if i == 0 else 1)
-                else:
-                    _values = shap_values[i]
-                result[c] = pd.DataFrame(_values, index=index,
-                                         columns=colnames).to_dict(orient='records')
+                result[c] = _to_records(stacked[i])
         else:  # self._is_regression
-            result = pd.DataFrame(shap_values, index=index,
-                                  columns=colnames).to_dict(orient='records')
+            result = _to_records(shap_values)
         return result
+
+    def explain_batch(self, records, samples=None):
+        """Explain several predictions in a single SHAP pass.
+
+        SHAP tree traversal is much cheaper when invoked once on a batch of
+        rows than once per row, so callers holding several records should
+        prefer this method over calling :func:`explain` in a loop. All the
+        records are preprocessed into one input and `shap_values` runs once;
+        the output is then split per record.
+
+        Args:
+            records (list[dict]): Records to be used as input data to explain
+                the model. Each record must contain one key per feature.
+                Example: `[{'feature1': 5, 'feature2': 'A', 'feature3': 10}]`
+            samples (dict): Records to be used as a sample pool for the
+                explanations (see :func:`explain`).
+        Returns:
+            list: One explanation per record. For classification each element
+            is a dictionary mapping class names to the SHAP values of the
+            record; for regression each element is the record of SHAP values.
+
+        Raises:
+            RuntimeError: If the model is not ready.
+            ValueError: If the model' predictor doesn't support SHAP
+                explanations or the explainer outputs an unknown object.
+        """
+        # The readiness and explainability guards are inlined in explain
+        explanation = self.explain(records, samples=samples)
+        if self._is_classification:
+            class_names = self._get_class_names()
+            per_class = [explanation[c] for c in class_names]
+            return [dict(zip(class_names, rows)) for rows in zip(*per_class)]
+        return explanation
@@ -0,0 +1,113 @@
+from concurrent.futures import Future
+from queue import Queue, Empty
+from threading import Thread
+from time import monotonic
+
+
+class BatchingPredictor(object):
+    """Coalesce concurrent prediction requests into single model calls.
+
+    Requests submitted within `window_ms` of each other (up to `max_batch`
+    records) are stacked into one input and served with a single call to the
+    wrapped model. For tree ensembles this lets the underlying prediction
+    loop run once over all rows instead of once per request, amortizing the
+    per-call framework overhead. Each caller blocks until its own slice of
+    the batched result is available. When the merged call fails (e.g. one
+    payload does not validate), every request of the batch is retried on
+    its own, so a caller only ever sees errors caused by its own payload
+    and the public methods keep the contract of the wrapped model.
+
+    Args:
+        model (:class:`src.model.base.BaseModel`):
+            Model instance used to serve the batched calls.
+        window_ms (int):
+            Time (in milliseconds) to wait for additional requests once the
+            first one of a batch has arrived.
+        max_batch (int):
+            Maximum number of records sent in one model call.
+    """
+
+    def __init__(self, model, window_ms=5, max_batch=64):
+        self._model = model
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._queue = Queue()
+        self._worker = Thread(target=self._serve_batches, daemon=True)
+        self._worker.start()
+
+    # Private
+    def _submit(self, function_name, features):
+        future = Future()
+        self._queue.put((function_name, features, future))
+        return future.result()
+
+    def _serve_batches(self):
+        while True:
+            # Block for the first request, then coalesce whatever arrives
+            # inside the window (bounded by max_batch)
+            batch = [self._queue.get()]
+            deadline = monotonic() + self._window
+            while len(batch) < self._max_batch:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except Empty:
+                    break
+            try:
+                self._dispatch(batch)
+            except Exception as err:
+                # The worker must survive anything: if it died, every
+                # subsequent caller would block forever on its future.
+                error = err
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _dispatch(self, batch):
+        # Group requests per prediction function: one model call per kind
+        groups = {}
+        for request in batch:
+            groups.setdefault(request[0], []).append(request)
+        for function_name, requests in groups.items():
+            function = getattr(self._model, function_name)
+            records, counts = [], []
+            for _, features, _ in requests:
+                rows = features if isinstance(features, list) else [features]
+                records.extend(rows)
+                counts.append(len(rows))
+            try:
+                result = function(records)
+            except Exception:
+                # One invalid payload must not fail the requests coalesced
+                # with it: retry each request on its own so only the guilty
+                # callers see their error.
+                for _, features, future in requests:
+                    try:
+                        future.set_result(function(features))
+                    except Exception as err:
+                        future.set_exception(err)
+                continue
+            # Fan the stacked result back out, one slice per request
+            offset = 0
+            for (_, _, future), n in zip(requests, counts):
+                future.set_result(result[offset:offset + n])
+                offset += n
+
+    # Public
+    def predict(self, features):
+        """Make a prediction through the batching queue.
+
+        Same contract as :func:`src.model.sklearn.SklearnModel.predict`: the
+        call blocks until the batch containing this request is served.
+        """
+        return self._submit('predict', features)
+
+    def predict_proba(self, features):
+        """Make a probability prediction through the batching queue.
+
+        Same contract as
+        :func:`src.model.sklearn.SklearnModel.predict_proba`.
+        """
+        return self._submit('predict_proba', features)
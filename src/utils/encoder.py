@@ -5,6 +5,11 @@ import pandas as pd
 
 from functools import wraps
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class ExtendedEncoder(flask.json.JSONEncoder):
     """Encoder of numpy primitives and Pandas objects into JSON strings"""
@@ -30,7 +35,13 @@ def returns_json(f):
         r = f(*args, **kwargs)
         if isinstance(r, flask.Response):
             return r
+        if orjson is not None:
+            # orjson writes the JSON bytes in C (including NumPy buffers),
+            # skipping the per-element Python walk of the stdlib encoder.
+            body = orjson.dumps(r, option=orjson.OPT_SERIALIZE_NUMPY,
+                                default=ExtendedEncoder().default)
         else:
-            return flask.Response(json.dumps(r, cls=ExtendedEncoder), status=200,
-                                  mimetype='application/json; charset=utf-8')
+            body = json.dumps(r, cls=ExtendedEncoder)
+        return flask.Response(body, status=200,
+                              mimetype='application/json; charset=utf-8')
     return decorated_function